@@ -11,5 +11,5 @@ Unless required by applicable law or agreed to in writing, software distributed
 language governing permissions and limitations under the License.
 """
 
-from .persistence import PersistenceManager, MemoryPersistenceManager
+from .persistence import PersistenceManager, MemoryPersistenceManager, SizedMemoryPersistenceManager
 from .shuffler import Shuffler
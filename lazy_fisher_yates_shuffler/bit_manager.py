@@ -17,11 +17,28 @@ language governing permissions and limitations under the License.
 from typing import Final
 
 
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(value: int) -> int:
+        """
+        Count the set bits in a value. Fallback for Python versions prior to 3.10, which lack int.bit_count().
+
+        :param value: Value.
+
+        :return: Number of set bits in value.
+        """
+
+        return bin(value).count("1")
+
+
 class BitManager:
     """
     Bit manager that provides bit-centric values and functions up to a specified bit count.
     """
 
+    __slots__ = ('_bit_count', '_all_bits')
+
     def __init__(self, bit_count: int):
         """
         Construct a bit manager.
@@ -35,48 +52,10 @@ class BitManager:
         Bit count.
         """
 
-        self._bitmasks: [int] = [0] * bit_count
-        """
-        Bitmasks. The value at any index has all bits up to and including the bit number represented by that index set.
-        """
-
-        self._not_bitmasks: [int] = [0] * bit_count
-        """
-        Not bitmasks. The value at any index has all bits except those up to and including the bit number represented by
-        that index set.
-        """
-
-        self._bits: [int] = [0] * bit_count
+        self._all_bits: Final[int] = (1 << bit_count) - 1
         """
-        Bits. The value at any index has the bit at the bit number represented by that index set.
-        """
-
-        self._not_bits: [int] = [0] * bit_count
+        Value of all bits set.
         """
-        Not bits. The value at any index has all bits set except the bit number represented by that index.
-        """
-
-        bitmask: int = 0
-        bit: int = 1
-
-        # Initialize bitmasks and bits.
-        for bit_number in range(bit_count):
-            bitmask |= bit
-
-            self._bitmasks[bit_number] = bitmask
-            self._bits[bit_number] = bit
-
-            bit <<= 1
-
-        self._all_bits: Final[int] = bitmask
-        """
-        Value of all bits set. This is equal to the last entry in the bitmasks array and is replicated for convenience.
-        """
-
-        # Initialize not bitmasks and not bits.
-        for bit_number in range(bit_count):
-            self._not_bitmasks[bit_number] = self._bitmasks[bit_number] ^ bitmask
-            self._not_bits[bit_number] = self._bits[bit_number] ^ bitmask
 
     @property
     def bit_count(self) -> int:
@@ -94,14 +73,15 @@ class BitManager:
 
         return self._all_bits
 
-    def bitmask(self, bit_number: int) -> int:
+    @staticmethod
+    def bitmask(bit_number: int) -> int:
         """
         :param bit_number: Bit number.
 
         :return: Bitmask with all bits up to and including bit number set.
         """
 
-        return self._bitmasks[bit_number]
+        return (2 << bit_number) - 1
 
     def not_bitmask(self, bit_number: int) -> int:
         """
@@ -110,9 +90,10 @@ class BitManager:
         :return: Not bitmask with all bits except those up to and including bit number set.
         """
 
-        return self._not_bitmasks[bit_number]
+        return self._all_bits ^ ((2 << bit_number) - 1)
 
-    def mask_to(self, value: int, bit_number: int) -> int:
+    @staticmethod
+    def mask_to(value: int, bit_number: int) -> int:
         """
         Apply bitmask to value.
 
@@ -122,7 +103,7 @@ class BitManager:
         :return: Value with all bits above bit number cleared.
         """
 
-        return value & self.bitmask(bit_number)
+        return value & ((2 << bit_number) - 1)
 
     def mask_from(self, value: int, bit_number: int) -> int:
         """
@@ -136,14 +117,15 @@ class BitManager:
 
         return value & self.not_bitmask(bit_number)
 
-    def bit(self, bit_number: int) -> int:
+    @staticmethod
+    def bit(bit_number: int) -> int:
         """
         :param bit_number: Bit number.
 
         :return: Bit at bit number.
         """
 
-        return self._bits[bit_number]
+        return 1 << bit_number
 
     def not_bit(self, bit_number: int) -> int:
         """
@@ -152,9 +134,10 @@ class BitManager:
         :return: All bits except that at bit number set.
         """
 
-        return self._not_bits[bit_number]
+        return self._all_bits ^ (1 << bit_number)
 
-    def is_set(self, value: int, bit_number: int) -> bool:
+    @staticmethod
+    def is_set(value: int, bit_number: int) -> bool:
         """
         Determine if a specified bit is set.
 
@@ -164,9 +147,10 @@ class BitManager:
         :return: True if bit at bit number in value is set.
         """
 
-        return value & self.bit(bit_number) != 0
+        return value & (1 << bit_number) != 0
 
-    def is_clear(self, value: int, bit_number: int) -> bool:
+    @staticmethod
+    def is_clear(value: int, bit_number: int) -> bool:
         """
         Determine if a specified bit is clear.
 
@@ -176,9 +160,10 @@ class BitManager:
         :return: True if bit at bit number in value is clear.
         """
 
-        return value & self.bit(bit_number) == 0
+        return value & (1 << bit_number) == 0
 
-    def set(self, value: int, bit_number: int) -> int:
+    @staticmethod
+    def set(value: int, bit_number: int) -> int:
         """
         Set a specified bit.
 
@@ -188,7 +173,7 @@ class BitManager:
         :return: Value with bit at bit number set.
         """
 
-        return value | self.bit(bit_number)
+        return value | (1 << bit_number)
 
     def clear(self, value: int, bit_number: int) -> int:
         """
@@ -202,7 +187,8 @@ class BitManager:
 
         return value & self.not_bit(bit_number)
 
-    def toggle(self, value: int, bit_number: int) -> int:
+    @staticmethod
+    def toggle(value: int, bit_number: int) -> int:
         """
         Toggle a specified bit.
 
@@ -212,4 +198,4 @@ class BitManager:
         :return: Value with bit at bit number toggled.
         """
 
-        return value ^ self.bit(bit_number)
+        return value ^ (1 << bit_number)
@@ -15,14 +15,24 @@ language governing permissions and limitations under the License.
 
 
 from abc import ABC, abstractmethod
+from array import array
 from typing import Final, Optional
 
 
+_UNMAPPED: Final[int] = -1 << 63
+"""
+Array entry in SizedMemoryPersistenceManager for an unmapped index or value. This is outside the range of any index or
+value.
+"""
+
+
 class NodeState:
     """
     Internal node state for persistence manager.
     """
 
+    __slots__ = ('_unstruck_count', '_unstruck_bitmap')
+
     def __init__(self, unstruck_count: int, unstruck_bitmap: int):
         """
         Initialize the node state.
@@ -68,6 +78,16 @@ class PersistenceManager(ABC):
     parameters across instantiations is an error.
     """
 
+    @property
+    def empty(self) -> bool:
+        """
+        :return: True if the persistence manager is known to hold no node state. The default implementation returns
+        False; implementations that can determine this cheaply should override it so that a new shuffler can skip
+        restoring its root.
+        """
+
+        return False
+
     @abstractmethod
     def save_node_state(self, key: int, node_state: NodeState):
         """
@@ -81,6 +101,17 @@ class PersistenceManager(ABC):
 
         pass
 
+    def save_node_states(self, node_states: [(int, NodeState)]):
+        """
+        Save multiple node states. The default implementation saves each node state individually; implementations
+        should override it if the underlying store supports more efficient bulk saves.
+
+        :param node_states: Pairs of persistence key and node state.
+        """
+
+        for key, node_state in node_states:
+            self.save_node_state(key, node_state)
+
     @abstractmethod
     def restore_node_state(self, key: int) -> Optional[NodeState]:
         """
@@ -155,14 +186,15 @@ class PersistenceManager(ABC):
         pass
 
 
-class MemoryPersistenceManager(PersistenceManager):
+class _MemoryNodeStatePersistenceManager(PersistenceManager):
     """
-    Persistence manager that maintains shuffler state and index/value pair mapping in memory.
+    Base for persistence managers that maintain shuffler state in memory, leaving index/value pair mapping to
+    subclasses.
     """
 
     def __init__(self):
         """
-        Construct an in-memory persistence manager.
+        Construct the in-memory node state store.
         """
 
         self._node_state_store: Final[dict] = dict()
@@ -170,6 +202,35 @@ class MemoryPersistenceManager(PersistenceManager):
         Dictionary for managing node state.
         """
 
+    @property
+    def empty(self) -> bool:
+        return len(self._node_state_store) == 0
+
+    def save_node_state(self, key: int, node_state: NodeState):
+        self._node_state_store[key] = node_state
+
+    def save_node_states(self, node_states: [(int, NodeState)]):
+        self._node_state_store.update(node_states)
+
+    def restore_node_state(self, key: int) -> Optional[NodeState]:
+        return self._node_state_store.get(key)
+
+    def delete_node_state(self, key: int):
+        self._node_state_store.pop(key, None)
+
+
+class MemoryPersistenceManager(_MemoryNodeStatePersistenceManager):
+    """
+    Persistence manager that maintains shuffler state and index/value pair mapping in memory.
+    """
+
+    def __init__(self):
+        """
+        Construct an in-memory persistence manager.
+        """
+
+        super().__init__()
+
         self._index_value_store: Final[dict] = dict()
         """
         Dictionary for managing index/value mapping.
@@ -180,34 +241,110 @@ class MemoryPersistenceManager(PersistenceManager):
         Dictionary for managing value/index mapping.
         """
 
-    def save_node_state(self, key: int, node_state: NodeState):
-        self._node_state_store[key] = node_state
+    def save_index_value(self, index: int, value: int):
+        self._index_value_store[index] = value
+        self._value_index_store[value] = index
 
-    def restore_node_state(self, key: int) -> Optional[NodeState]:
-        try:
-            return self._node_state_store[key]
-        except KeyError:
-            return None
+    def delete_index_value(self, index: int, value):
+        self._value_index_store.pop(value, None)
+        self._index_value_store.pop(index, None)
 
-    def delete_node_state(self, key: int):
-        del self._node_state_store[key]
+    def value_at(self, index: int) -> Optional[int]:
+        return self._index_value_store.get(index)
+
+    def index_of(self, value: int) -> Optional[int]:
+        return self._value_index_store.get(value)
+
+
+class SizedMemoryPersistenceManager(_MemoryNodeStatePersistenceManager):
+    """
+    Persistence manager that maintains shuffler state in memory and index/value pair mapping in memory in fixed-width
+    arrays sized to the shuffler. Each pair costs 16 bytes rather than two dictionary entries; cyclic shufflers, whose
+    incomplete loops are stored as negative values, need up to a further 8 bytes per pair, allocated as required. This
+    is considerably smaller than MemoryPersistenceManager for large shufflers, though somewhat slower per operation.
+    The arrays are extended as necessary if the shuffler is resized.
+    """
+
+    def __init__(self, size: int):
+        """
+        Construct a sized in-memory persistence manager.
+
+        :param size: Size of the shuffler in which the persistence manager is to be used.
+        """
+
+        super().__init__()
+
+        self._values: Final[array] = array('q', [_UNMAPPED]) * size
+        """
+        Values by index.
+        """
+
+        self._indexes: Final[array] = array('q', [_UNMAPPED]) * size
+        """
+        Indexes by non-negative value.
+        """
+
+        self._not_indexes: Final[array] = array('q')
+        """
+        Indexes by negative (cyclic) value, stored at ~value. Extended only when negative values are saved.
+        """
+
+    @staticmethod
+    def _extend(store: array, position: int):
+        """
+        Extend a store so that it includes a position. Callers check the position against the store length first so
+        that the common case costs no call.
+
+        :param store: Store.
+
+        :param position: Position, known to be beyond the end of the store.
+        """
+
+        store.extend(array('q', [_UNMAPPED]) * max(position + 1 - len(store), len(store)))
 
     def save_index_value(self, index: int, value: int):
-        self._index_value_store[index] = value
-        self._value_index_store[value] = index
+        values: Final[array] = self._values
+
+        if index >= len(values):
+            SizedMemoryPersistenceManager._extend(values, index)
+
+        values[index] = value
+
+        store: Final[array] = self._indexes if value >= 0 else self._not_indexes
+        position: Final[int] = value if value >= 0 else ~value
+
+        if position >= len(store):
+            SizedMemoryPersistenceManager._extend(store, position)
+
+        store[position] = index
 
     def delete_index_value(self, index: int, value):
-        del self._value_index_store[value]
-        del self._index_value_store[index]
+        if value >= 0:
+            self._indexes[value] = _UNMAPPED
+        else:
+            self._not_indexes[~value] = _UNMAPPED
+
+        self._values[index] = _UNMAPPED
 
     def value_at(self, index: int) -> Optional[int]:
-        try:
-            return self._index_value_store[index]
-        except KeyError:
-            return None
+        values: Final[array] = self._values
+
+        if 0 <= index < len(values):
+            value: Final[int] = values[index]
+
+            if value != _UNMAPPED:
+                return value
+
+        return None
 
     def index_of(self, value: int) -> Optional[int]:
-        try:
-            return self._value_index_store[value]
-        except KeyError:
-            return None
+        store: Final[array] = self._indexes if value >= 0 else self._not_indexes
+        position: Final[int] = value if value >= 0 else ~value
+
+        if position < len(store):
+            index: Final[int] = store[position]
+
+            if index != _UNMAPPED:
+                return index
+
+        return None
@@ -20,9 +20,9 @@ language governing permissions and limitations under the License.
 from __future__ import annotations
 
 from random import Random
-from typing import Final, Optional
+from typing import Final, Iterable, MutableSequence, Optional
 
-from .bit_manager import BitManager
+from .bit_manager import BitManager, popcount
 from .persistence import NodeState, PersistenceManager, MemoryPersistenceManager
 
 
@@ -31,6 +31,8 @@ class _Node:
     Node in binary tree for lazy Fisher-Yates shuffle.
     """
 
+    __slots__ = ('shuffler', 'key', 'bit_number', 'terminal', 'struck_count', 'struck_bitmap', '_right', '_left')
+
     def __init__(self, shuffler: Shuffler, key: int, bit_number: int, restore: bool):
         """
         Construct a node.
@@ -60,7 +62,7 @@ class _Node:
         """
 
         # Terminal node supports up to TERMINAL_SIZE entries.
-        self.terminal: Final[bool] = bit_number == Shuffler._TERMINAL_SIZE_BIT_COUNT - 1
+        self.terminal: Final[bool] = bit_number == shuffler._terminal_size_bit_count - 1
         """
         True if this node is a terminal node.
         """
@@ -85,9 +87,11 @@ class _Node:
             self.struck_count = 0
             self.struck_bitmap = 0
         else:
-            self.struck_count = node_state.struck_count
             self.struck_bitmap = node_state.struck_bitmap
 
+            # Struck count of terminal node is derived from struck bitmap to guarantee consistency.
+            self.struck_count = node_state.struck_count if not self.terminal else popcount(self.struck_bitmap)
+
         self._right: Optional[_Node] = None
         """
         Right node for managing bit = 0.
@@ -118,7 +122,7 @@ class _Node:
 
         if self._right is None:
             # Right key is key-2^(bit_number+1).
-            self._right = self.init_right_left(self.key - self.shuffler.bit_manager.bit(self.bit_number + 1))
+            self._right = self.init_right_left(self.key - (1 << (self.bit_number + 1)))
 
         return self._right
 
@@ -134,15 +138,19 @@ class _Node:
 
         return self._left
 
-    def validate_state(self, keys: [int], size: int, cyclic: bool):
+    def validate_state(self, keys: [int], size: int, cyclic: bool, pending: [(_Node, int)]):
         """
         Validate node, ensuring that struck count is consistent with right and left nodes (if not terminal) or with
-        struck bitmap (if terminal). Used for testing.
+        struck bitmap (if terminal). Right and left nodes are not validated here but are added to the pending list for
+        the caller to validate. Used for testing.
+
+        :param keys: Keys of validated nodes, to which this node's key is added.
 
-        :param keys:
         :param size: Expected node size.
 
         :param cyclic: If true, values are generated in a cyclic pattern.
+
+        :param pending: Nodes pending validation with their expected sizes, to which right and left nodes are added.
         """
 
         keys.append(self.key)
@@ -224,17 +232,18 @@ class _Node:
             if self.struck_bitmap != 0:
                 raise Exception("Non-zero struck bitmap at non-terminal node {}".format(self.key))
 
-            if right is not None:
-                right.validate_state(keys, right_size, cyclic)
-
+            # Left is added first so that right is validated first.
             if left is not None:
-                left.validate_state(keys, left_size, cyclic)
+                pending.append((left, left_size))
+
+            if right is not None:
+                pending.append((right, right_size))
         else:
             # Terminal nodes shouldn't have right and/or left nodes.
             if self._right is not None or self._left is not None:
                 raise Exception("Unexpected right and/or left nodes at terminal node {}".format(self.key))
 
-            struck_bit_count: Final[int] = self.struck_bitmap.bit_count()
+            struck_bit_count: Final[int] = popcount(self.struck_bitmap)
 
             # Struck count should equal number of bits in struck bitmap.
             if self.struck_count != struck_bit_count:
@@ -246,8 +255,8 @@ class Shuffler:
     """
     Shuffler. Values are randomly selected across a provided range using a lazy Fisher-Yates shuffle
     (https://en.wikipedia.org/wiki/Fisher%E2%80%93Yates_shuffle), where step 3 of the original method strikes the Kth
-    entry not yet struck by building a binary tree on demand with each terminal node managing a 64-bit array
-    representing the struck entries.
+    entry not yet struck by building a binary tree on demand with each terminal node managing a bit array (64 bits by
+    default) representing the struck entries.
 
     The shuffler has two variants: non-cyclic and cyclic. The non-cyclic variant is the traditional Fisher-Yates
     shuffle, where the only requirement in the selection of the value for any unique index is that it not have been
@@ -258,40 +267,18 @@ class Shuffler:
 
     _TERMINAL_SIZE: Final[int] = 64
     """
-    Terminal size (number of bits in qword).
-    """
-
-    _TERMINAL_SIZE_BITMASK: Final[int] = _TERMINAL_SIZE - 1
-    """
-    Terminal size bitmask.
-    """
-
-    _TERMINAL_SIZE_BIT_COUNT: Final[int] = _TERMINAL_SIZE_BITMASK.bit_count()
-    """
-    Terminal size bit count.
-    """
-
-    _TERMINAL_BIT_MANAGER: Final[BitManager] = BitManager(_TERMINAL_SIZE)
-    """
-    Bit manager for terminal struck bitmap manipulation.
-    """
-
-    _BIT_COUNT_BITMASK_2: Final[int] = 0x5555555555555555
-    """
-    Bitmask for 2 binary digits bit count (even bits).
-    """
-
-    _BIT_COUNT_BITMASK_4: Final[int] = 0x3333333333333333
-    """
-    Bitmask for 4 binary digits bit count (even 2-bit groups).
+    Default and minimum terminal size (number of bits in qword).
     """
 
-    _BIT_COUNT_BITMASK_8: Final[int] = 0x0F0F0F0F0F0F0F0F
+    _BYTE_SELECT: Final[tuple] = tuple(tuple(bit_number for bit_number in range(8) if byte >> bit_number & 1)
+                                       for byte in range(256))
     """
-    Bitmask for 8 binary digits bit count (even nibbles).
+    Positions of the set bits in every byte value, lowest first; _BYTE_SELECT[byte][k] is the position of the kth set
+    bit in byte.
     """
 
-    def __init__(self, size: int, cyclic: bool, persistence_manager: Optional[PersistenceManager] = None):
+    def __init__(self, size: int, cyclic: bool, persistence_manager: Optional[PersistenceManager] = None,
+                 terminal_size: int = _TERMINAL_SIZE):
         """
         Construct a shuffler.
 
@@ -300,18 +287,60 @@ class Shuffler:
         :param size: Size. Inputs and values range from 0 to size-1.
 
         :param persistence_manager: Persistence manager; defaults to memory persistence manager if None.
+
+        :param terminal_size: Number of entries managed by each terminal node; must be a power of 2 no less than 64.
+        Larger terminal sizes make the tree shallower, which speeds up value generation for large shufflers at the
+        expense of larger terminal node states. Changing the terminal size invalidates any persisted state.
         """
 
+        if terminal_size < Shuffler._TERMINAL_SIZE or popcount(terminal_size) != 1:
+            raise Exception("Terminal size {} must be a power of 2 >= {}".format(terminal_size,
+                                                                                 Shuffler._TERMINAL_SIZE))
+
         self._cyclic: Final[bool] = cyclic
         """
         If true, values are generated in a cyclic pattern.
         """
 
+        self._terminal_size: Final[int] = terminal_size
+        """
+        Terminal size.
+        """
+
+        self._terminal_size_bitmask: Final[int] = terminal_size - 1
+        """
+        Terminal size bitmask.
+        """
+
+        self._terminal_size_bit_count: Final[int] = popcount(self._terminal_size_bitmask)
+        """
+        Terminal size bit count.
+        """
+
+        self._terminal_all_bits: Final[int] = (1 << terminal_size) - 1
+        """
+        Value of all bits set in terminal struck bitmap.
+        """
+
+        self._terminal_windows: Final[tuple] = tuple(
+            (window_bit_count, (1 << window_bit_count) - 1)
+            for window_bit_count in (1 << bit_number
+                                     for bit_number in range(self._terminal_size_bit_count - 1, 5, -1)))
+        """
+        Window bit counts and bitmasks for narrowing terminal bit selection down to 64 bits (empty for the default
+        terminal size).
+        """
+
         self._random: Final[Random] = Random()
         """
         Randomizer.
         """
 
+        self._getrandbits: Final = self._random.getrandbits
+        """
+        Randomizer getrandbits method, bound once for performance.
+        """
+
         self._persistence_manager: Final[PersistenceManager] = persistence_manager \
             if persistence_manager is not None else \
             MemoryPersistenceManager()
@@ -324,6 +353,11 @@ class Shuffler:
         Bit manager up to size bit length + 1 for fast bit manipulation.
         """
 
+        self._bits: tuple = ()
+        """
+        Bits up to size bit length + 1, aligned with bit manager.
+        """
+
         self._size: int = size
         """
         Size.
@@ -358,6 +392,14 @@ class Shuffler:
 
         return self._cyclic
 
+    @property
+    def terminal_size(self) -> int:
+        """
+        :return: Terminal size.
+        """
+
+        return self._terminal_size
+
     @property
     def persistence_manager(self) -> PersistenceManager:
         """
@@ -383,15 +425,18 @@ class Shuffler:
 
         # If size is an exact power of two, subtracting 1 will force the bit length down by 1; round up to value for
         # full capacity terminal node if necessary.
-        size_bit_length: Final[int] = max((self.size - 1).bit_length(), Shuffler._TERMINAL_SIZE_BIT_COUNT)
+        size_bit_length: Final[int] = max((self.size - 1).bit_length(), self._terminal_size_bit_count)
 
         # New root must be created if not resizing (no root yet) or root bit number is changing.
         if not resizing or size_bit_length != self._root.bit_number + 1:
             # Bit manager is aligned with number of bits in root.
             self._bit_manager = BitManager(size_bit_length + 1)
+            self._bits = tuple(1 << bit_number for bit_number in range(size_bit_length + 1))
 
-            # Root key is 2^(size_bit_length+1)-1.
-            new_root: Final[_Node] = _Node(self, self.bit_manager.all_bits, size_bit_length - 1, not resizing)
+            # Root key is 2^(size_bit_length+1)-1. Restore is pointless if resizing (root has been rebuilt from the
+            # old root) or if persistence manager is known to be empty.
+            new_root: Final[_Node] = _Node(self, self.bit_manager.all_bits, size_bit_length - 1,
+                                           not resizing and not self._persistence_manager.empty)
 
             if resizing:
                 # Copy struck count from old root.
@@ -429,6 +474,16 @@ class Shuffler:
 
         self.persistence_manager.save_node_state(node.key, NodeState(node.struck_count, node.struck_bitmap))
 
+    def save_node_states(self, nodes: [_Node]):
+        """
+        Save the states of multiple nodes to the persistence manager in a single call.
+
+        :param nodes: Nodes.
+        """
+
+        self._persistence_manager.save_node_states([(node.key, NodeState(node.struck_count, node.struck_bitmap))
+                                                    for node in nodes])
+
     def _next_value(self):
         """
         Generate the next value.
@@ -436,118 +491,132 @@ class Shuffler:
         :return: Next value, randomly selected from remaining unstruck entries.
         """
 
-        incremental_value: int = self._random.randrange(0, self._remaining_size)
+        remaining_size: Final[int] = self._remaining_size
+        getrandbits: Final = self._getrandbits
+
+        # Equivalent to randrange(0, remaining_size) (same rejection sampling as Random._randbelow) without the argument
+        # processing overhead.
+        remaining_size_bit_length: Final[int] = remaining_size.bit_length()
 
-        self._remaining_size -= 1
+        incremental_value: int = getrandbits(remaining_size_bit_length)
+
+        while incremental_value >= remaining_size:
+            incremental_value = getrandbits(remaining_size_bit_length)
+
+        self._remaining_size = remaining_size - 1
 
         value: int = 0
 
+        bits: Final[tuple] = self._bits
+
+        # Nodes along the descent, saved together once the descent is complete.
+        struck_nodes: [_Node] = []
+
         node: Optional[_Node] = self._root
 
         while node is not None:
-            pending_save_node: _Node = node
+            struck_nodes.append(node)
 
             # One entry in current node or a descendant will be struck.
             node.struck_count += 1
 
             if not node.terminal:
-                right: _Node = node.right
+                # Properties are invoked only when construction is necessary.
+                right: Optional[_Node] = node._right
+                if right is None:
+                    right = node.right
 
                 # Normalize output to right node by adding number of struck entries in right node.
                 right_normalized_output: int = incremental_value + right.struck_count
 
+                bit: int = bits[node.bit_number]
+
                 # Index is in range of right node if current node's bit is clear.
-                if self.bit_manager.is_clear(right_normalized_output, node.bit_number):
+                if right_normalized_output & bit == 0:
                     node = right
                 else:
-                    # Clear bit on incremental value and set bit on value to account for right normalized value.
-                    incremental_value = self.bit_manager.clear(right_normalized_output, node.bit_number)
-                    value = self.bit_manager.set(value, node.bit_number)
+                    # Clear bit on incremental value (known to be set, so exclusive or clears it) and set bit on value
+                    # to account for right normalized value.
+                    incremental_value = right_normalized_output ^ bit
+                    value |= bit
 
-                    node = node.left
+                    node = node._left if node._left is not None else node.left
             else:
-                terminal_incremental_value_remaining: int = incremental_value
                 terminal_value: int
 
-                # These variables record the individual steps, except the last, of the bit count algorithm from Figure
-                # 5-2 of Hacker's Delight, 2nd edition, by Henry S. Warren, Jr., to count the bits in the unstruck
-                # bitmap.
-
-                # Each variable contains the count of the named number of bits repeating up to the size of a long
-                # integer (e.g., bitCount4 contains 16 counts of 4-bit sets).
-
-                # Need to find an unstruck bit, so invert the struck bitmap to begin.
-                bit_count_1: int = node.struck_bitmap ^ Shuffler._TERMINAL_BIT_MANAGER.all_bits
-                bit_count_2: int = bit_count_1 - (bit_count_1 >> 0x01 & Shuffler._BIT_COUNT_BITMASK_2)
-                bit_count_4: int = ((bit_count_2 & Shuffler._BIT_COUNT_BITMASK_4) +
-                                    (bit_count_2 >> 0x02 & Shuffler._BIT_COUNT_BITMASK_4))
-                bit_count_8: int = (bit_count_4 + (bit_count_4 >> 0x04)) & Shuffler._BIT_COUNT_BITMASK_8
-                bit_count_16: int = bit_count_8 + (bit_count_8 >> 0x08)
-                bit_count_32: int = bit_count_16 + (bit_count_16 >> 0x10)
-
-                # Starting with the broadest bit count, each block does the following:
-                #
-                #   1. Shifts the bit count to the right to accommodate the shift, stored in the terminal index,
-                #      determined by the previous steps (does not apply to the first block).
-                #   2. Extracts the right-most bit count and compares it to the incremental index remaining.
-                #   3. If less than or equal, the incremental index remaining is to the left, so:
-                #       a. subtracts the right-most bit count from the incremental index remaining; and
-                #       b. adds the number of bits considered (using bitwise "or" as all numbers are powers of 2) to the
-                #          terminal index (first block does straight assignment).
-                #
-                # Although a loop would yield cleaner code, the unrolled loop is faster.
-
-                right_bit_count: int
-
-                # 32-bit bit count; mask limits count to 0-32.
-                right_bit_count = bit_count_32 & 0x3F
-                if right_bit_count <= terminal_incremental_value_remaining:
-                    terminal_incremental_value_remaining -= right_bit_count
-                    terminal_value = 0x20
+                if node.struck_bitmap == 0:
+                    # No entries struck; incremental value is the terminal value.
+                    terminal_value = incremental_value
+                elif node.struck_count == self._terminal_size:
+                    # Only one entry unstruck (struck count already includes this strike); it's the highest bit.
+                    terminal_value = (node.struck_bitmap ^ self._terminal_all_bits).bit_length() - 1
                 else:
+                    terminal_incremental_value_remaining: int = incremental_value
+
                     terminal_value = 0x00
 
-                # 16-bit bit count; mask limits count to 0-16.
-                right_bit_count = bit_count_16 >> terminal_value & 0x1F
-                if right_bit_count <= terminal_incremental_value_remaining:
-                    terminal_incremental_value_remaining -= right_bit_count
-                    terminal_value |= 0x10
-
-                # 8-bit bit count; mask limits count to 0-8.
-                right_bit_count = bit_count_8 >> terminal_value & 0x0F
-                if right_bit_count <= terminal_incremental_value_remaining:
-                    terminal_incremental_value_remaining -= right_bit_count
-                    terminal_value |= 0x08
-
-                # 4-bit bit count; mask limits count to 0-4.
-                right_bit_count = bit_count_4 >> terminal_value & 0x07
-                if right_bit_count <= terminal_incremental_value_remaining:
-                    terminal_incremental_value_remaining -= right_bit_count
-                    terminal_value |= 0x04
-
-                # 2-bit bit count; mask limits count to 0-2.
-                right_bit_count = bit_count_2 >> terminal_value & 0x03
-                if right_bit_count <= terminal_incremental_value_remaining:
-                    terminal_incremental_value_remaining -= right_bit_count
-                    terminal_value |= 0x02
-
-                # 1-bit bit count; mask limits count to 0-1.
-                right_bit_count = bit_count_1 >> terminal_value & 0x01
-                if right_bit_count <= terminal_incremental_value_remaining:
-                    terminal_incremental_value_remaining -= right_bit_count
-                    terminal_value |= 0x01
-
-                assert terminal_incremental_value_remaining == 0, "Terminal incremental output remaining is not zero"
+                    # Need to find an unstruck bit, so invert the struck bitmap to begin.
+                    unstruck_bitmap: int = node.struck_bitmap ^ self._terminal_all_bits
+
+                    # The terminal value is the position of the unstruck bit whose rank is the incremental value. It
+                    # is narrowed down to a byte by binary search over bit counts of successively narrower windows,
+                    # then resolved within the byte by table lookup. Each search block does the following:
+                    #
+                    #   1. Counts the unstruck bits in the right half of the window.
+                    #   2. If less than or equal to the incremental value remaining, the target bit is in the left
+                    #      half, so:
+                    #       a. subtracts the right half bit count from the incremental value remaining;
+                    #       b. shifts the unstruck bitmap to the right to discard the right half; and
+                    #       c. adds the number of bits discarded (using bitwise "or" as all numbers are powers of 2) to
+                    #          the terminal value.
+                    #
+                    # Windows wider than 32 bits exist only for terminal sizes above the default and are searched in
+                    # a loop. Although a loop would yield cleaner code for the rest, the unrolled loop is faster.
+
+                    right_bit_count: int
+
+                    for window_bit_count, window_bitmask in self._terminal_windows:
+                        right_bit_count = popcount(unstruck_bitmap & window_bitmask)
+                        if right_bit_count <= terminal_incremental_value_remaining:
+                            terminal_incremental_value_remaining -= right_bit_count
+                            unstruck_bitmap >>= window_bit_count
+                            terminal_value |= window_bit_count
+
+                    # 32-bit window.
+                    right_bit_count = popcount(unstruck_bitmap & 0xFFFFFFFF)
+                    if right_bit_count <= terminal_incremental_value_remaining:
+                        terminal_incremental_value_remaining -= right_bit_count
+                        unstruck_bitmap >>= 0x20
+                        terminal_value |= 0x20
+
+                    # 16-bit window.
+                    right_bit_count = popcount(unstruck_bitmap & 0xFFFF)
+                    if right_bit_count <= terminal_incremental_value_remaining:
+                        terminal_incremental_value_remaining -= right_bit_count
+                        unstruck_bitmap >>= 0x10
+                        terminal_value |= 0x10
+
+                    # 8-bit window.
+                    right_bit_count = popcount(unstruck_bitmap & 0xFF)
+                    if right_bit_count <= terminal_incremental_value_remaining:
+                        terminal_incremental_value_remaining -= right_bit_count
+                        unstruck_bitmap >>= 0x08
+                        terminal_value |= 0x08
+
+                    # Position within the remaining byte; index is out of range if the incremental value remaining
+                    # exceeds the number of unstruck bits in the byte.
+                    terminal_value |= \
+                        Shuffler._BYTE_SELECT[unstruck_bitmap & 0xFF][terminal_incremental_value_remaining]
 
                 # Set bit to mark entry as struck.
-                node.struck_bitmap = Shuffler._TERMINAL_BIT_MANAGER.set(node.struck_bitmap, terminal_value)
+                node.struck_bitmap |= 1 << terminal_value
 
                 # Add terminal value to cumulative value.
                 value |= terminal_value
 
                 node = None
 
-            self.save_node_state(pending_save_node)
+        self.save_node_states(struck_nodes)
 
         return value
 
@@ -564,8 +633,10 @@ class Shuffler:
         if not 0 <= index < self._size:
             raise Exception("Index {} must be >=0 and < {}".format(index, self._size))
 
+        persistence_manager: Final[PersistenceManager] = self._persistence_manager
+
         # Check for previous generation of value.
-        value: Optional[int] = self._persistence_manager.value_at(index)
+        value: Optional[int] = persistence_manager.value_at(index)
 
         randomized: bool
 
@@ -592,81 +663,143 @@ class Shuffler:
                     not_loop_start = value
 
                     # Delete existing index/value pair.
-                    self.persistence_manager.delete_index_value(index, value)
+                    persistence_manager.delete_index_value(index, value)
 
-                terminal_bit_number: Final[int] = loop_start & Shuffler._TERMINAL_SIZE_BITMASK
+                terminal_bit: Final[int] = 1 << (loop_start & self._terminal_size_bitmask)
 
+                bits: Final[tuple] = self._bits
+
+                # Reserved nodes are not saved unless the reserve is permanent. If it's temporary, the only nodes
+                # that need saving are those struck by the next value, identified by a struck count after unreserve
+                # that differs from the struck count before reserve; the persisted state of all others is unchanged.
                 reserved_nodes: [_Node] = []
+                reserved_struck_counts: [int] = []
 
                 node: Optional[_Node] = self._root
 
                 while node is not None:
-                    pending_save_node: _Node = node
-
                     reserved_nodes.append(node)
+                    reserved_struck_counts.append(node.struck_count)
 
                     # One entry in current node or a descendant is being reserved.
                     node.struck_count += 1
 
                     if not node.terminal:
                         # Loop start is in range of right node if current node's bit is clear.
-                        node = node.right \
-                            if self.bit_manager.is_clear(loop_start, node.bit_number) else \
-                            node.left
+                        # Properties are invoked only when construction is necessary.
+                        if loop_start & bits[node.bit_number] == 0:
+                            node = node._right if node._right is not None else node.right
+                        else:
+                            node = node._left if node._left is not None else node.left
                     else:
                         # Set bit to mark entry as struck.
-                        node.struck_bitmap = Shuffler._TERMINAL_BIT_MANAGER.set(node.struck_bitmap, terminal_bit_number)
+                        node.struck_bitmap |= terminal_bit
 
                         node = None
 
-                    self.save_node_state(pending_save_node)
-
                 # Account for reserve.
-                self._remaining_size -= 1
+                reserved_remaining_size: Final[int] = self._remaining_size - 1
 
-                # Store reserved remaining size (faster than incrementing after unreserve).
-                reserved_remaining_size: Final[int] = self._remaining_size
+                self._remaining_size = reserved_remaining_size
 
                 # Remaining size is zero if final loop is being closed.
-                if self._remaining_size != 0:
+                if reserved_remaining_size != 0:
                     value = self._next_value()
 
                     # Persistence manager returns None if value is the end of its loop, otherwise value is the start of
                     # an existing loop that will be joined to this one.
-                    loop_end: int = self._persistence_manager.index_of(~value)
+                    loop_end: int = persistence_manager.index_of(~value)
                     if loop_end is None:
                         loop_end = value
 
                     # Join loop end to loop start with not bit value to indicate incompleteness.
-                    self._persistence_manager.save_index_value(loop_end, not_loop_start)
+                    persistence_manager.save_index_value(loop_end, not_loop_start)
 
                     for reserved_node in reserved_nodes:
                         # One entry in current node or a descendant is being unreserved.
                         reserved_node.struck_count -= 1
 
                         if reserved_node.terminal:
-                            # Clear bit to mark entry as unreserved.
-                            reserved_node.struck_bitmap = Shuffler._TERMINAL_BIT_MANAGER.clear(
-                                reserved_node.struck_bitmap, terminal_bit_number)
+                            # Clear bit (known to be set) to mark entry as unreserved.
+                            reserved_node.struck_bitmap ^= terminal_bit
 
-                        if reserved_node.struck_count != 0:
-                            self.save_node_state(reserved_node)
-                        else:
-                            self.persistence_manager.delete_node_state(reserved_node.key)
+                    self.save_node_states([reserved_node for reserved_node, reserved_struck_count
+                                           in zip(reserved_nodes, reserved_struck_counts)
+                                           if reserved_node.struck_count != reserved_struck_count])
 
                     self._remaining_size = reserved_remaining_size
                 else:
-                    # Close the loop.
+                    # Close the loop; reserve is permanent.
+                    self.save_node_states(reserved_nodes)
+
                     value = loop_start
 
         if randomized:
             # Store index/value pair.
-            self._persistence_manager.save_index_value(index, value)
+            persistence_manager.save_index_value(index, value)
 
         assert 0 <= value < self._size, "Value {} must be >=0 and < {}".format(value, self._size)
 
         return value
 
+    def _non_cyclic_fill(self, indexes: Iterable[int], out: MutableSequence[int]):
+        """
+        Fill a mutable sequence with the values at multiple indexes for a non-cyclic shuffler. The non-cyclic logic of
+        value_at() is inlined here once for both values_at() and fill().
+
+        :param indexes: Indexes.
+
+        :param out: Mutable sequence with at least as many elements as there are indexes. This may be the indexes
+        themselves, as each index is read before its position is written.
+        """
+
+        size: Final[int] = self._size
+        persistence_value_at: Final = self._persistence_manager.value_at
+        save_index_value: Final = self._persistence_manager.save_index_value
+        next_value: Final = self._next_value
+
+        position: int = 0
+
+        value: Optional[int]
+
+        for index in indexes:
+            if not 0 <= index < size:
+                raise Exception("Index {} must be >=0 and < {}".format(index, size))
+
+            value = persistence_value_at(index)
+
+            if value is None:
+                value = next_value()
+
+                save_index_value(index, value)
+
+            out[position] = value
+
+            position += 1
+
+    def values_at(self, indexes: Iterable[int]) -> [int]:
+        """
+        Get the values at multiple indexes. The result is the equivalent of calling value_at() on each index in order,
+        without the per-call overhead.
+
+        :param indexes: Indexes.
+
+        :return: Values at indexes.
+        """
+
+        if self._cyclic:
+            # Cyclic logic of value_at() is too involved to inline; bind value_at once rather than on every iteration.
+            value_at: Final = self.value_at
+
+            return [value_at(index) for index in indexes]
+
+        # Values replace the indexes in a copy of them.
+        values: [int] = list(indexes)
+
+        self._non_cyclic_fill(values, values)
+
+        return values
+
     def index_of(self, value: int) -> Optional[int]:
         """
         Get the index for a given value. If the value is found in the persistence manager, the corresponding index is
@@ -679,6 +812,18 @@ class Shuffler:
 
         return self._persistence_manager.index_of(value)
 
+    def indexes_of(self, values: Iterable[int]) -> [Optional[int]]:
+        """
+        Get the indexes for multiple values. The result is the equivalent of calling index_of() on each value in order,
+        without the per-call overhead.
+
+        :param values: Values.
+
+        :return: Indexes of values, each None if value has not yet been generated.
+        """
+
+        return list(map(self._persistence_manager.index_of, values))
+
     def resize(self, new_size: int):
         """
         Resize the input. Care should be taken with this operation as it will make multiple calls to the persistence
@@ -699,6 +844,37 @@ class Shuffler:
 
             self._build_root()
 
+    def fill(self, out: MutableSequence[int]) -> int:
+        """
+        Fill a preallocated mutable sequence (e.g., list or array.array) with values in iteration order. The result is
+        the equivalent of assigning successive values from iter(self) to successive elements of out, without the
+        per-value iterator overhead. Filling stops at the end of out or the end of the iteration, whichever comes
+        first.
+
+        :param out: Mutable sequence to fill.
+
+        :return: Number of values filled.
+        """
+
+        count: Final[int] = min(len(out), self._size)
+
+        value: Optional[int]
+
+        if not self._cyclic:
+            self._non_cyclic_fill(range(count), out)
+        else:
+            # Bind value_at once rather than on every iteration.
+            value_at: Final = self.value_at
+
+            # Cycle covers the entire size, so iteration doesn't end before count is reached.
+            value = 0
+
+            for position in range(count):
+                value = value_at(value)
+                out[position] = value
+
+        return count
+
     def validate_state(self):
         """
         Validate the entire tree, ensuring that all struck counts and bitmaps are as expected. Used for testing.
@@ -710,7 +886,13 @@ class Shuffler:
 
         keys: [int] = []
 
-        self._root.validate_state(keys, self.size, self.cyclic)
+        # Explicit stack rather than recursion.
+        pending: [(_Node, int)] = [(self._root, self.size)]
+
+        while len(pending) != 0:
+            node, size = pending.pop()
+
+            node.validate_state(keys, size, self.cyclic, pending)
 
         keys.sort()
 
@@ -723,7 +905,7 @@ class Shuffler:
 
             maximum_key = key
 
-        if minimum_key < Shuffler._TERMINAL_SIZE_BITMASK << 1 | 1:
+        if minimum_key < self._terminal_size_bitmask << 1 | 1:
             raise Exception("Invalid minimum key {}".format(minimum_key))
 
         if maximum_key != minimum_key and maximum_key >= 1 << ((self.size - 1).bit_length() + 1):
@@ -734,6 +916,8 @@ class Shuffler:
         Iterator overlay for shuffler.
         """
 
+        __slots__ = ('_shuffler', '_next_index')
+
         def __init__(self, shuffler: Shuffler):
             """
             Construct an iterator.
@@ -751,6 +935,13 @@ class Shuffler:
             Next index for which to get value.
             """
 
+        def __iter__(self):
+            """
+            :return: Self, as required of an iterator.
+            """
+
+            return self
+
         def __next__(self):
             """
             :return: Next value in the iteration.
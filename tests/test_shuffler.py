@@ -14,10 +14,12 @@ language governing permissions and limitations under the License.
 """
 
 
-from typing import Final, Iterable
+from array import array
+from itertools import islice
+from typing import Final, Iterable, Iterator
 from unittest import TestCase
 
-from lazy_fisher_yates_shuffler import MemoryPersistenceManager
+from lazy_fisher_yates_shuffler import MemoryPersistenceManager, PersistenceManager, SizedMemoryPersistenceManager
 from lazy_fisher_yates_shuffler import Shuffler
 
 
@@ -27,70 +29,86 @@ class TestShuffler(TestCase):
     validate_interval: Final[int] = 10889
 
     def _generate(self, shuffler: Shuffler, iterable: Iterable, indexes: [int], values: [int]):
-        validate_countdown: int = 0
+        iterator: Final[Iterator] = iter(iterable)
 
-        for index in iterable:
-            # Validate state periodically.
-            if validate_countdown == 0:
-                shuffler.validate_state()
-                validate_countdown = self.validate_interval
+        while True:
+            # Process in chunks, validating state before each.
+            chunk: [int] = list(islice(iterator, self.validate_interval))
 
-            value: int = shuffler.value_at(index)
+            if len(chunk) == 0:
+                break
 
-            # Check that no duplicates have been generated.
-            self.assertEqual(-1, indexes[value])
-            self.assertEqual(-1, values[index])
+            shuffler.validate_state()
 
-            indexes[value] = index
-            values[index] = value
+            for index, value in zip(chunk, shuffler.values_at(chunk)):
+                # Check that no duplicates have been generated. Plain comparisons are cheaper than assertion calls on
+                # every value; assertion fails with details only if a check fails.
+                if indexes[value] != -1 or values[index] != -1:
+                    self.fail("Duplicate at index {}, value {}: previous value {}, previous index {}".format(
+                        index, value, values[index], indexes[value]))
 
-            validate_countdown -= 1
+                indexes[value] = index
+                values[index] = value
 
         # Iteration may not cover entire size; validate at the end with whatever remaining size.
         shuffler.validate_state()
 
-    def _compare(self, shuffler: Shuffler, iterable: Iterable, indexes: [int], values: [int]):
-        for index in iterable:
-            value: int = shuffler.value_at(index)
+    def _compare(self, shuffler: Shuffler, indexes_range: range, indexes: [int], values: [int]):
+        compared_values: [int] = shuffler.values_at(indexes_range)
 
-            # Check that indexes and values match.
-            self.assertEqual(index, indexes[value])
-            self.assertEqual(value, values[index])
+        # Check that indexes and values match, comparing whole lists rather than each entry.
+        self.assertEqual(values[indexes_range.start:indexes_range.stop], compared_values)
+        self.assertEqual(list(indexes_range), [indexes[value] for value in compared_values])
 
     def _assert_cyclic(self, shuffler: Shuffler):
-        visited: [bool] = [False] * shuffler.size
+        # Get the entire permutation in a single call so that the cycle is walked over a list.
+        permutation: [int] = shuffler.values_at(range(shuffler.size))
+
+        # One byte per entry; 1 if visited.
+        visited: bytearray = bytearray(shuffler.size)
 
         index: int = 0
 
         while True:
             self.assertFalse(visited[index])
 
-            visited[index] = True
+            visited[index] = 1
 
-            index = shuffler.value_at(index)
+            index = permutation[index]
 
             # Break when index returns to its starting point.
             if index == 0:
                 break
 
-        for index in range(shuffler.size):
-            self.assertTrue(visited[index], index)
-
-    def _test_repeatable(self, cyclic: bool):
-        shuffler: Shuffler = Shuffler(self.size, cyclic)
+        # Every entry must have been visited.
+        self.assertEqual(-1, visited.find(0))
 
+    def _test_repeatable(self, shuffler: Shuffler):
         indexes: [int] = [-1] * self.size
         values: [int] = [-1] * self.size
 
         self._generate(shuffler, range(self.size), indexes, values)
         self._compare(shuffler, range(self.size), indexes, values)
 
-        if cyclic:
+        if shuffler.cyclic:
             self._assert_cyclic(shuffler)
 
     def test_repeatable(self):
-        self._test_repeatable(False)
-        self._test_repeatable(True)
+        self._test_repeatable(Shuffler(self.size, False))
+        self._test_repeatable(Shuffler(self.size, True))
+
+    def test_terminal_size(self):
+        for terminal_size in (128, 4096):
+            self._test_repeatable(Shuffler(self.size, False, terminal_size=terminal_size))
+            self._test_repeatable(Shuffler(self.size, True, terminal_size=terminal_size))
+
+            shuffler: Shuffler = Shuffler(20, False, terminal_size=terminal_size)
+            shuffler.value_at(10)
+            shuffler.resize(terminal_size * 4 + 1)
+            shuffler.validate_state()
+
+        self.assertRaises(Exception, lambda: Shuffler(self.size, False, terminal_size=32))
+        self.assertRaises(Exception, lambda: Shuffler(self.size, False, terminal_size=100))
 
     def _test_cyclic(self, sequential: bool):
         shuffler: Shuffler = Shuffler(self.size, True)
@@ -100,20 +118,25 @@ class TestShuffler(TestCase):
 
         self._generate(shuffler, range(self.size) if sequential else Shuffler(self.size, False), indexes, values)
 
-        visited: [bool] = [False] * self.size
+        # Get the entire permutation in a single call so that the cycle is walked over a list.
+        permutation: [int] = shuffler.values_at(range(self.size))
+
+        # Bound once rather than on every iteration.
+        assert_false: Final = self.assertFalse
+
+        visited: bytearray = bytearray(self.size)
         value: int = 0
 
         for index in range(self.size):
-            value = shuffler.value_at(value)
+            value = permutation[value]
 
-            self.assertFalse(visited[value])
+            assert_false(visited[value])
 
-            visited[value] = True
+            visited[value] = 1
 
         self.assertEqual(0, value)
 
-        for index in range(self.size):
-            self.assertTrue(visited[index])
+        self.assertEqual(-1, visited.find(0))
 
     def test_cyclic(self):
         self._test_cyclic(True)
@@ -128,13 +151,17 @@ class TestShuffler(TestCase):
 
         shuffler.validate_state()
 
+        # Bound once rather than on every iteration.
+        value_at: Final = shuffler.value_at
+        assert_equal: Final = self.assertEqual
+
         for value in shuffler:
             # Check that no duplicates have been generated.
-            self.assertEqual(-1, indexes[value])
-            self.assertEqual(-1, values[index])
+            assert_equal(-1, indexes[value])
+            assert_equal(-1, values[index])
 
             # Check that value was generated from expected index.
-            self.assertEqual(value, shuffler.value_at(index))
+            assert_equal(value, value_at(index))
 
             indexes[value] = index
             values[index] = value
@@ -146,6 +173,14 @@ class TestShuffler(TestCase):
         self.assertNotIn(-1, indexes)
         self.assertNotIn(-1, values)
 
+        class SubclassIterator(Shuffler.Iterator):
+            pass
+
+        # Iterator constructed directly or subclassed must follow the same order as iterator from shuffler, including
+        # for cyclic.
+        self.assertEqual(list(shuffler), list(Shuffler.Iterator(shuffler)))
+        self.assertEqual(list(shuffler), list(SubclassIterator(shuffler)))
+
         if cyclic:
             self._assert_cyclic(shuffler)
 
@@ -153,14 +188,12 @@ class TestShuffler(TestCase):
         self._test_iterable(False)
         self._test_iterable(True)
 
-    def test_persistence_manager(self):
+    def _test_persistence_manager(self, persistence_manager: PersistenceManager):
         size_3_4_int: int = self.size * 3 // 4
 
         indexes: [int] = [-1] * self.size
         values: [int] = [-1] * self.size
 
-        persistence_manager: MemoryPersistenceManager = MemoryPersistenceManager()
-
         shuffler1: Shuffler = Shuffler(self.size, False, persistence_manager)
 
         self._generate(shuffler1, range(size_3_4_int), indexes, values)
@@ -171,6 +204,84 @@ class TestShuffler(TestCase):
         self._generate(shuffler2, range(size_3_4_int, self.size), indexes, values)
         self._compare(shuffler2, range(self.size), indexes, values)
 
+    def _test_fill(self, cyclic: bool):
+        shuffler: Shuffler = Shuffler(self.size, cyclic)
+
+        half_out: array = array('q', [-1]) * (self.size // 2)
+        out: array = array('q', [-1]) * self.size
+
+        self.assertEqual(self.size // 2, shuffler.fill(half_out))
+        self.assertEqual(self.size, shuffler.fill(out))
+
+        # Partial fill must match the start of the full fill.
+        self.assertEqual(out[:self.size // 2], half_out)
+
+        # Fill stops at the end of the iteration and leaves the rest of a longer sequence untouched.
+        long_out: array = array('q', [-1]) * (self.size + 10)
+
+        self.assertEqual(self.size, shuffler.fill(long_out))
+        self.assertEqual(out, long_out[:self.size])
+        self.assertEqual(array('q', [-1]) * 10, long_out[self.size:])
+
+        shuffler.validate_state()
+
+        # Fill must match iteration, which replays the values already generated.
+        self.assertEqual(list(shuffler), out.tolist())
+
+        if cyclic:
+            self._assert_cyclic(shuffler)
+
+    def _test_values_at(self, cyclic: bool):
+        shuffler: Shuffler = Shuffler(self.size, cyclic)
+
+        reverse_indexes: range = range(self.size - 1, -1, -1)
+
+        # Values at must match value at for values both generated and already generated.
+        values: [int] = shuffler.values_at(reverse_indexes)
+
+        self.assertEqual([shuffler.value_at(index) for index in reverse_indexes], values)
+        self.assertEqual(values, shuffler.values_at(reverse_indexes))
+        self.assertEqual(list(reverse_indexes), shuffler.indexes_of(values))
+
+        shuffler.validate_state()
+
+        self.assertRaises(Exception, lambda: shuffler.values_at([0, self.size]))
+
+    def test_values_at(self):
+        self._test_values_at(False)
+        self._test_values_at(True)
+
+    def test_fill(self):
+        self._test_fill(False)
+        self._test_fill(True)
+
+    def test_persistence_manager(self):
+        self._test_persistence_manager(MemoryPersistenceManager())
+        self._test_persistence_manager(SizedMemoryPersistenceManager(self.size))
+
+    def _test_sized_persistence_manager(self, cyclic: bool):
+        initial_size: int = 20
+
+        indexes: [int] = [-1] * self.size
+        values: [int] = [-1] * self.size
+
+        shuffler: Shuffler = Shuffler(initial_size, cyclic, SizedMemoryPersistenceManager(initial_size))
+
+        self._generate(shuffler, range(initial_size // 2), indexes, values)
+
+        # Persistence manager must grow with the shuffler.
+        shuffler.resize(self.size)
+
+        self._generate(shuffler, range(initial_size // 2, self.size), indexes, values)
+        self._compare(shuffler, range(self.size), indexes, values)
+
+        if cyclic:
+            self._assert_cyclic(shuffler)
+
+    def test_sized_persistence_manager(self):
+        self._test_sized_persistence_manager(False)
+        self._test_sized_persistence_manager(True)
+
     def _test_resize(self, cyclic: bool):
         terminal_to_non_terminal_shuffler: Shuffler = Shuffler(20, cyclic)
         terminal_to_non_terminal_shuffler.validate_state()
@@ -180,11 +291,14 @@ class TestShuffler(TestCase):
         test_size: int = 20
 
         shuffler: Shuffler = Shuffler(test_size, cyclic)
-        index_value_dict: dict = dict()
+
+        # Each range of generated indexes begins within the previous one, so generated indexes are contiguous from the
+        # start of the first and their values are kept in a list rather than a dictionary.
+        generated_start: Final[int] = test_size // 2
+        generated_values: [int] = []
 
         for resize_index in range(20):
-            for index in range(test_size // 2, test_size):
-                index_value_dict[index] = shuffler.value_at(index)
+            generated_values[test_size // 2 - generated_start:] = shuffler.values_at(range(test_size // 2, test_size))
 
             shuffler.validate_state()
 
@@ -199,14 +313,14 @@ class TestShuffler(TestCase):
 
             shuffler.validate_state()
 
-            for index, value in index_value_dict.items():
-                self.assertEqual(value, shuffler.value_at(index))
-                self.assertEqual(index, shuffler.index_of(value))
+            generated_indexes: range = range(generated_start, generated_start + len(generated_values))
+
+            self.assertEqual(generated_values, shuffler.values_at(generated_indexes))
+            self.assertEqual(list(generated_indexes), shuffler.indexes_of(generated_values))
 
         if not cyclic:
             # Consume entire range.
-            for index in range(test_size):
-                index_value_dict[index] = shuffler.value_at(index)
+            shuffler.values_at(range(test_size))
 
             shuffler.resize(test_size + 1)
         else: